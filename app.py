@@ -21,12 +21,16 @@ import requests
 import base64
 import json
 import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 from urllib.parse import quote_plus
 import streamlit.components.v1 as components
 from typing import Optional
 from io import BytesIO
 import re
+from content_formats import CONTENT_FORMATS, parse_multiformat_response
 
 # Optional cloud libs
 try:
@@ -39,10 +43,18 @@ except Exception:
 try:
     from google.cloud import storage as gcs_storage
     from google.oauth2 import service_account
+    from google.api_core.exceptions import Forbidden as GCSForbidden
     GCS_AVAILABLE = True
 except Exception:
     GCS_AVAILABLE = False
 
+# Worker threads need the script run context to touch st.session_state
+try:
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+except Exception:
+    add_script_run_ctx = None
+    get_script_run_ctx = None
+
 # -------------------------
 # ADMIN CREDENTIALS & API KEYS (Option A: embed here)
 # Replace values below with your real keys and secure credentials.
@@ -112,6 +124,24 @@ if "s3_bucket" not in st.session_state:
 if "gcs_credentials_json" not in st.session_state:
     st.session_state.gcs_credentials_json = None
 
+# -------------------------
+# CONCURRENCY HELPER
+# -------------------------
+def run_concurrently(fn, items, max_workers: int = 4) -> list:
+    """Map fn over items on a thread pool, keeping order. fn should not raise."""
+    items = list(items)
+    if len(items) <= 1:
+        return [fn(x) for x in items]
+    ctx = get_script_run_ctx() if get_script_run_ctx else None
+
+    def _call(x):
+        if ctx is not None and add_script_run_ctx:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(x)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        return list(pool.map(_call, items))
+
 # -------------------------
 # MODEL & AI HELPERS
 # -------------------------
@@ -178,6 +208,30 @@ def generate_cover_image_via_genai(prompt: str, size: str = "1200x628") -> Optio
         logger.warning("Image generation failed: %s", e)
         return None
 
+@st.cache_data(max_entries=12, show_spinner=False)
+def cached_cover_image(prompt: str, size: str, _generate: bool = True) -> bytes:
+    """Cached per (prompt, size). Raises on failure so failures are never cached; _generate=False only reads the cache."""
+    if not _generate:
+        raise LookupError("cover not cached")
+    img = generate_cover_image_via_genai(prompt, size=size)
+    if not img:
+        raise RuntimeError("image generation failed")
+    return img
+
+def _cover_or_none(prompt: str, size: str, generate: bool) -> Optional[bytes]:
+    try:
+        return cached_cover_image(prompt, size, _generate=generate)
+    except Exception:
+        return None
+
+def generate_cover_variants(prompts: list, size: str) -> list:
+    """Return image bytes (or None) per prompt; cache hits skip the API, misses run concurrently."""
+    return run_concurrently(lambda p: _cover_or_none(p, size, True), prompts)
+
+def cached_cover_variants(prompts: list, size: str) -> list:
+    """Read-only cache lookup (no API calls, no threads); cheap enough to run on every rerun."""
+    return [_cover_or_none(p, size, False) for p in prompts]
+
 # -------------------------
 # Unified AI engine: Gemini -> Groq -> fallback
 # -------------------------
@@ -290,26 +344,105 @@ def ask_ai_unified(prompt: str):
     st.session_state.last_ai_error = err
     return err
 
+# -------------------------
+# Marketing Studio: single-call multi-format drafts
+# -------------------------
+ALL_FORMATS_LABEL = "All formats (campaign pack)"
+
+def build_content_prompt(ctype: str, tone: str, topic: str) -> str:
+    return f"Act as a Senior Marketing Manager. Write a professional {ctype} in a {tone.lower()} tone about: {topic}."
+
+def build_all_formats_prompt(tone: str, topic: str) -> str:
+    keys = ", ".join(f'"{f}"' for f in CONTENT_FORMATS)
+    return (
+        f"Act as a Senior Marketing Manager. In a {tone.lower()} tone, write a campaign pack about: {topic}.\n"
+        "Produce each of these formats: a professional Blog Post, an Instagram Carousel (slide-by-slide captions), "
+        "a LinkedIn Post and a Client Email.\n"
+        f"Return ONLY a JSON object with exactly these keys: {keys}. "
+        "Each value must be the finished text for that format as a single string (use \\n for line breaks). "
+        "No commentary, no code fences."
+    )
+
+def generate_all_formats(topic: str, tone: str) -> dict:
+    """One provider call for every format; only parts that fail to parse are re-drafted, in parallel."""
+    out = ask_ai_unified(build_all_formats_prompt(tone, topic))
+    if out.startswith("ERROR"):
+        # providers are down; per-format retries would fail the same way
+        return {f: out for f in CONTENT_FORMATS}
+    parts = parse_multiformat_response(out, CONTENT_FORMATS)
+    missing = [f for f in CONTENT_FORMATS if f not in parts]
+    if missing:
+        logger.info("Multi-format reply missing %s; falling back to per-format calls", missing)
+        retries = run_concurrently(lambda f: ask_ai_unified(build_content_prompt(f, tone, topic)), missing)
+        parts.update(zip(missing, retries))
+    return {f: parts[f] for f in CONTENT_FORMATS}
+
 # -------------------------
 # Cloud upload helpers (S3/GCS)
 # -------------------------
-def upload_to_s3(bytes_data: bytes, bucket: str, object_name: str, region: str, access_key: str, secret_key: str) -> str:
+def content_object_key(bytes_data: bytes, prefix: str = "blog_covers", ext: str = "jpg") -> str:
+    """Object key derived from the content hash, so identical bytes map to the same key."""
+    return f"{prefix}/{hashlib.sha256(bytes_data).hexdigest()}.{ext}"
+
+def upload_to_s3(bytes_data: bytes, bucket: str, object_name: str, region: str, access_key: str, secret_key: str) -> tuple:
+    """Returns (public_url, skipped); skipped is True when the stored object already has these exact bytes."""
     if not BOTO3_AVAILABLE:
         raise RuntimeError("boto3 not available")
     s3 = boto3.client("s3", region_name=region, aws_access_key_id=access_key, aws_secret_access_key=secret_key)
+    url = f"https://{bucket}.s3.{region}.amazonaws.com/{object_name}"
+    try:
+        head = s3.head_object(Bucket=bucket, Key=object_name)
+        # single-part PUT ETag is the hex MD5 of the body
+        if head.get("ETag", "").strip('"') == hashlib.md5(bytes_data).hexdigest():
+            logger.info("S3 object %s already holds these bytes, skipping upload", object_name)
+            return url, True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") not in ("403", "404", "NoSuchKey", "NotFound"):
+            raise
     s3.put_object(Bucket=bucket, Key=object_name, Body=bytes_data, ACL="public-read", ContentType="image/jpeg")
-    return f"https://{bucket}.s3.{region}.amazonaws.com/{object_name}"
+    return url, False
 
-def upload_to_gcs(bytes_data: bytes, bucket_name: str, object_name: str, credentials_json: dict) -> str:
+def upload_to_gcs(bytes_data: bytes, bucket_name: str, object_name: str, credentials_json: dict) -> tuple:
+    """Returns (public_url, skipped); skipped is True when the stored object already has these exact bytes."""
     if not GCS_AVAILABLE:
         raise RuntimeError("gcs lib not available")
     credentials = service_account.Credentials.from_service_account_info(credentials_json)
     client = gcs_storage.Client(credentials=credentials, project=credentials.project_id)
     bucket = client.bucket(bucket_name)
+    try:
+        existing = bucket.get_blob(object_name)
+    except GCSForbidden:
+        # upload-only service accounts cannot read metadata; upload as before
+        existing = None
+    # GCS reports md5_hash as base64 of the raw digest
+    if existing is not None and existing.md5_hash == base64.b64encode(hashlib.md5(bytes_data).digest()).decode():
+        # re-apply in case the earlier upload's make_public() failed
+        existing.make_public()
+        logger.info("GCS object %s already holds these bytes, skipping upload", object_name)
+        return existing.public_url, True
     blob = bucket.blob(object_name)
     blob.upload_from_string(bytes_data, content_type="image/jpeg")
     blob.make_public()
-    return blob.public_url
+    return blob.public_url, False
+
+def upload_to_destinations(bytes_data: bytes, object_name: str, s3_cfg: Optional[dict] = None, gcs_cfg: Optional[dict] = None) -> dict:
+    """Push to every configured destination in parallel. Returns {destination: (url, skipped, error)}."""
+    jobs = []
+    if s3_cfg:
+        jobs.append(("AWS S3", lambda: upload_to_s3(bytes_data, s3_cfg["bucket"], object_name, s3_cfg["region"], s3_cfg["access_key"], s3_cfg["secret_key"])))
+    if gcs_cfg:
+        jobs.append(("Google Cloud Storage", lambda: upload_to_gcs(bytes_data, gcs_cfg["bucket"], object_name, gcs_cfg["credentials_json"])))
+
+    def _run(job):
+        name, fn = job
+        try:
+            url, skipped = fn()
+            return name, (url, skipped, None)
+        except Exception as e:
+            logger.warning("%s upload failed: %s", name, e)
+            return name, (None, False, str(e))
+
+    return dict(run_concurrently(_run, jobs))
 # app.py — chunk 2 of 4
 """
 Main layout: Header + Tabs 1-5
@@ -455,15 +588,24 @@ with tabs[0]:
 # -------------------------
 with tabs[1]:
     render_bg_section("Content", "<div class='hero-title'><h1>Marketing Studio</h1><p class='subtitle'>Human-friendly marketing drafts — blog, social, email.</p></div>")
-    ctype = st.selectbox("Content Type", ["Blog Post", "Instagram Carousel", "LinkedIn Post", "Client Email"], key="content_type")
+    ctype = st.selectbox("Content Type", CONTENT_FORMATS + [ALL_FORMATS_LABEL], key="content_type")
     topic = st.text_input("Topic", value="Why invest in OMR?", key="content_topic")
     tone = st.selectbox("Tone", ["Professional", "Conversational", "Persuasive"], index=1, key="content_tone")
     if st.button("Draft Content", key="content_generate"):
         if not topic.strip():
             st.warning("Enter a topic.")
+        elif ctype == ALL_FORMATS_LABEL:
+            with st.spinner("Writing all formats..."):
+                pack = generate_all_formats(topic, tone)
+            for fmt, out in pack.items():
+                st.markdown(f"**{fmt}**")
+                if out.startswith("ERROR_BOTH_PROVIDERS") or out.startswith("ERROR"):
+                    st.error(f"AI providers failed for {fmt}. Please try again later.")
+                else:
+                    st.code(out, language="text")
         else:
             with st.spinner("Writing..."):
-                prompt = f"Act as a Senior Marketing Manager. Write a professional {ctype} in a {tone.lower()} tone about: {topic}."
+                prompt = build_content_prompt(ctype, tone, topic)
                 out = ask_ai_unified(prompt)
             if out.startswith("ERROR_BOTH_PROVIDERS") or out.startswith("ERROR"):
                 st.error("AI providers failed. Showing fallback sample.")
@@ -557,7 +699,8 @@ with tabs[5]:
         b_poss = st.text_input("Possession", value="Check developer brochure", key="blog_poss")
         b_phone = st.text_input("Sales phone", value="919876543210", key="blog_phone")
         b_email = st.text_input("Sales email", value="sales@draexample.com", key="blog_email")
-        cover_style = st.selectbox("Cover image style", ["Photorealistic exterior (golden hour)", "Lifestyle (residents silhouettes)", "Architectural render clean look"], key="cover_style")
+        cover_styles = ["Photorealistic exterior (golden hour)", "Lifestyle (residents silhouettes)", "Architectural render clean look"]
+        cover_style = st.selectbox("Preferred cover style (prompt below; highlighted among generated variants)", cover_styles, key="cover_style")
 
     if st.button("Generate Blog (Home Konnect markdown)", key="blog_generate"):
         prompt = (
@@ -613,25 +756,43 @@ with tabs[5]:
     st.markdown("---")
     usps_list = [u.strip() for u in b_usps.split(",") if u.strip()]
     usps_short = "; ".join(usps_list[:4])
-    image_prompt_text = (
-        f"Blog cover image for a real estate project named '{b_project}' located in {b_location}. "
-        f"Style: {cover_style}. Modern mid-rise apartment exterior at golden hour, landscaped foreground with families (silhouettes), "
-        f"soft city background, clean space for title/logo overlay, subtle 'Home Konnect' watermark bottom-right, cinematic composition, vibrant yet natural colors, no recognizable faces, 1200x628. Include props that suggest: {usps_short}."
-    )
+
+    def build_cover_prompt(style_name: str) -> str:
+        return (
+            f"Blog cover image for a real estate project named '{b_project}' located in {b_location}. "
+            f"Style: {style_name}. Modern mid-rise apartment exterior at golden hour, landscaped foreground with families (silhouettes), "
+            f"soft city background, clean space for title/logo overlay, subtle 'Home Konnect' watermark bottom-right, cinematic composition, vibrant yet natural colors, no recognizable faces, 1200x628. Include props that suggest: {usps_short}."
+        )
+
+    image_prompt_text = build_cover_prompt(cover_style)
     st.subheader("Cover Image Prompt")
     st.code(image_prompt_text, language="text")
     if st.button("Copy Prompt (manually)", key="copy_prompt"):
         st.write("Please copy the prompt from the box above and paste into your image generator (clipboard not available via server).")
 
-    if st.button("Try Generate Cover Image (auto)", key="gen_cover_auto"):
-        with st.spinner("Attempting image generation..."):
-            img_bytes = generate_cover_image_via_genai(image_prompt_text, size="1200x628")
-            if img_bytes:
-                st.image(img_bytes, width=700, caption="Generated cover image")
-                st.session_state._last_cover_bytes = img_bytes
-                st.download_button("Download generated cover", data=img_bytes, file_name=f"{b_project.replace(' ','_')}_cover.jpg", mime="image/jpeg", key="download_generated_cover")
-            else:
-                st.warning("Automatic image generation not available. Use the prompt above in Midjourney / DALL·E / SD or upload an image below.")
+    # One variant per cover style; cached per prompt + size so reopening the same project is instant
+    cover_size = "1200x628"
+    variant_prompts = [build_cover_prompt(sn) for sn in cover_styles]
+    if st.button("Try Generate Cover Images (all styles, auto)", key="gen_cover_auto"):
+        with st.spinner(f"Generating {len(variant_prompts)} cover variants..."):
+            generated = generate_cover_variants(variant_prompts, cover_size)
+        if not any(generated):
+            st.warning("Automatic image generation not available. Use the prompt above in Midjourney / DALL·E / SD or upload an image below.")
+    # Read-only cache lookup: shows covers generated earlier without calling the image API
+    variants = cached_cover_variants(variant_prompts, cover_size)
+    if any(variants):
+        st.markdown("**Generated cover variants** (all styles; ⭐ marks your preferred style) — pick one to use:")
+        v_cols = st.columns(len(cover_styles))
+        for i, (sn, img_bytes) in enumerate(zip(cover_styles, variants)):
+            with v_cols[i]:
+                if not img_bytes:
+                    st.caption(f"{sn}: not available — generation failed or not run yet")
+                    continue
+                st.image(img_bytes, width=220, caption=f"⭐ {sn}" if sn == cover_style else sn)
+                if st.button("Use this cover", key=f"use_cover_{i}"):
+                    st.session_state._last_cover_bytes = img_bytes
+                    st.success("Cover selected. Use the Uploads tab to push to cloud storage.")
+                st.download_button("Download", data=img_bytes, file_name=f"{b_project.replace(' ','_')}_cover_{i + 1}.jpg", mime="image/jpeg", key=f"download_generated_cover_{i}")
 
     st.markdown("**Or upload your own cover image (JPEG / PNG)**")
     uploaded = st.file_uploader("Upload cover image", type=["jpg","jpeg","png"], key="blog_upload_cover")
@@ -650,40 +811,35 @@ with tabs[6]:
         st.info("No cover image in session. Generate or upload an image in the Blog tab.")
     else:
         st.image(st.session_state._last_cover_bytes, width=600, caption="Selected image ready for upload")
-        dest = st.selectbox("Upload destination", ["None", "AWS S3", "Google Cloud Storage"], key="uploads_dest")
-        if dest == "AWS S3":
+        dests = st.multiselect("Upload destinations", ["AWS S3", "Google Cloud Storage"], key="uploads_dests")
+        s3_cfg, gcs_cfg = None, None
+        if "AWS S3" in dests:
             if not BOTO3_AVAILABLE:
                 st.error("boto3 not installed. Install to enable S3 uploads.")
             else:
                 s3_bucket = st.text_input("S3 Bucket", value=st.session_state.s3_bucket or "", key="uploads_s3_bucket")
                 s3_region = st.text_input("S3 Region", value=st.session_state.s3_region or "", key="uploads_s3_region")
-                s3_key = st.text_input("S3 object key (e.g., blog/covers/mycover.jpg)", value=f"blog_covers/{int(time.time())}_{(b_project or 'project').replace(' ','_')}.jpg", key="uploads_s3_key")
-                if st.button("Upload to S3", key="upload_to_s3"):
-                    try:
-                        access = st.session_state.s3_access_key
-                        secret = st.session_state.s3_secret_key
-                        url = upload_to_s3(st.session_state._last_cover_bytes, s3_bucket, s3_key, s3_region, access, secret)
-                        st.success("Uploaded to S3.")
-                        st.write("Public URL:", url)
-                    except Exception as e:
-                        st.error(f"S3 upload failed: {e}")
-        elif dest == "Google Cloud Storage":
+                s3_cfg = {"bucket": s3_bucket, "region": s3_region, "access_key": st.session_state.s3_access_key, "secret_key": st.session_state.s3_secret_key}
+        if "Google Cloud Storage" in dests:
             if not GCS_AVAILABLE:
                 st.error("google-cloud-storage not installed. Install it to enable GCS uploads.")
+            elif not st.session_state.gcs_credentials_json:
+                st.error("GCS credentials not provided in admin sidebar.")
             else:
                 gcs_bucket = st.text_input("GCS Bucket", key="uploads_gcs_bucket")
-                gcs_key = st.text_input("GCS object name", value=f"blog_covers/{int(time.time())}_{(b_project or 'project').replace(' ','_')}.jpg", key="uploads_gcs_key")
-                if st.button("Upload to GCS", key="upload_to_gcs"):
-                    try:
-                        credentials_json = st.session_state.gcs_credentials_json
-                        if not credentials_json:
-                            st.error("GCS credentials not provided in admin sidebar.")
-                        else:
-                            url = upload_to_gcs(st.session_state._last_cover_bytes, gcs_bucket, gcs_key, credentials_json)
-                            st.success("Uploaded to GCS.")
-                            st.write("Public URL:", url)
-                    except Exception as e:
-                        st.error(f"GCS upload failed: {e}")
+                gcs_cfg = {"bucket": gcs_bucket, "credentials_json": st.session_state.gcs_credentials_json}
+        # Content-hash key: re-uploading the same cover reuses the existing object
+        obj_key = content_object_key(st.session_state._last_cover_bytes)
+        st.caption(f"Object key: {obj_key}")
+        if st.button("Upload", key="upload_to_cloud", disabled=not (s3_cfg or gcs_cfg)):
+            with st.spinner("Uploading..."):
+                results = upload_to_destinations(st.session_state._last_cover_bytes, obj_key, s3_cfg=s3_cfg, gcs_cfg=gcs_cfg)
+            for name, (url, skipped, err) in results.items():
+                if err:
+                    st.error(f"{name} upload failed: {err}")
+                else:
+                    st.success(f"Already uploaded to {name} — reusing the existing object." if skipped else f"Uploaded to {name}.")
+                    st.write("Public URL:", url)
 
 # -------------------------
 # Tab: Zoho Deluge
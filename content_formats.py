@@ -0,0 +1,57 @@
+"""
+Marketing Studio content formats and parsing of single-call multi-format replies.
+
+Kept free of Streamlit so it can be imported by app.py and by the tests.
+"""
+
+import json
+import re
+from typing import Optional
+
+CONTENT_FORMATS = ["Blog Post", "Instagram Carousel", "LinkedIn Post", "Client Email"]
+
+# strict=False accepts the raw newlines models often leave inside JSON strings
+_DECODER = json.JSONDecoder(strict=False)
+
+def _clean_part(val) -> Optional[str]:
+    """Validate one part: a non-empty string, or a list of strings (carousel slides)."""
+    if isinstance(val, list) and all(isinstance(v, str) for v in val):
+        val = "\n\n".join(v.strip() for v in val if v.strip())
+    if isinstance(val, str) and val.strip():
+        return val.strip()
+    return None
+
+def _first_object(text: str, formats: list) -> Optional[dict]:
+    """First JSON object in text that carries any of the format keys; braces in prose are skipped."""
+    for m in re.finditer(r"\{", text):
+        try:
+            obj, _ = _DECODER.raw_decode(text, m.start())
+        except ValueError:
+            continue
+        if isinstance(obj, dict) and any(f in obj for f in formats):
+            return obj
+    return None
+
+def parse_multiformat_response(text: str, formats: list) -> dict:
+    """Extract {format: text} from a JSON-delimited reply; formats that are missing or invalid are left out.
+
+    Parts are recovered one by one, so a truncated or partly broken object still
+    yields every complete key/value pair.
+    """
+    if not text:
+        return {}
+    data = _first_object(text, formats) or {}
+    parts = {}
+    for f in formats:
+        val = data.get(f)
+        if val is None:
+            m = re.search(r'"%s"\s*:\s*' % re.escape(f), text)
+            if m:
+                try:
+                    val, _ = _DECODER.raw_decode(text, m.end())
+                except ValueError:
+                    val = None
+        cleaned = _clean_part(val)
+        if cleaned:
+            parts[f] = cleaned
+    return parts
@@ -0,0 +1,435 @@
+"""
+KonnectOps load test & rerun profiler.
+
+Drives simulated marketer sessions through admin login and all eight tabs of
+app.py using Streamlit's AppTest harness, with the Gemini / Groq / image
+providers stubbed out (no network, no API quota). Produces a JSON report that
+can be compared across releases:
+
+    python loadtest.py --sessions 20 --concurrency 8 --out report.json
+    python loadtest.py --sessions 20 --concurrency 8 --baseline old_report.json
+
+Three passes are run:
+- profile: one session under cProfile -> hot spots (render_bg_section, sidebar uploader loop, ...)
+- memory:  one session under tracemalloc -> per-session memory
+- load:    N sessions, each in its own worker process -> per-rerun wall time per step, throughput, RSS per session
+
+Sessions run in separate processes because AppTest swaps process-global state
+(Runtime instance, st.secrets) on every run and is not thread-safe.
+Requires streamlit>=1.28 (streamlit.testing.v1).
+"""
+
+# -------------------------
+# IMPORTS
+# -------------------------
+import argparse
+import ast
+import base64
+import cProfile
+import importlib
+import json
+import os
+import platform
+import pstats
+import re
+import statistics
+import struct
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import zlib
+import multiprocessing
+from contextlib import ExitStack
+from unittest import mock
+
+try:
+    import resource
+except Exception:
+    resource = None
+
+try:
+    import psutil
+except Exception:
+    psutil = None
+
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+PAGE_KEYS = ["Landing", "Content", "Images", "Calendar", "Utilities", "Blog", "Uploads", "Zoho"]
+
+# Third-party modules app.py imports; preloaded in workers so per-session RSS excludes import cost.
+APP_DEPS = ["pandas", "requests", "google.generativeai", "streamlit.components.v1", "boto3", "google.cloud.storage"]
+
+# Functions (by name) whose cost is reported individually in the profile pass.
+HOT_SPOTS = ["render_bg_section", "file_uploader", "ask_ai_unified", "generate_all_formats", "generate_cover_variants", "cached_cover_variants", "local_homekonnect_blog"]
+
+# -------------------------
+# PROVIDER STUBS
+# -------------------------
+def tiny_png() -> bytes:
+    """1x1 white PNG built by hand so the stub needs no imaging library."""
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+    ihdr = struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)
+    idat = zlib.compress(b"\x00\xff\xff\xff")
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", idat) + chunk(b"IEND", b"")
+
+class FakeModelInfo:
+    name = "models/gemini-2.0-flash"
+    supported_generation_methods = ["generateContent"]
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeGenerativeModel:
+    latency = 0.0
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def generate_content(self, prompt):
+        time.sleep(self.latency)
+        if "Return ONLY a JSON object" in prompt:
+            keys = re.findall(r'"([^"]+)"', prompt.split("keys:", 1)[-1].split(".", 1)[0])
+            return FakeResponse(json.dumps({k: f"Stub {k}. " + "Lorem ipsum dolor sit amet. " * 10 for k in keys}))
+        return FakeResponse(f"# Stub draft\n\n{prompt[:200]}\n\n" + "Lorem ipsum dolor sit amet. " * 40)
+
+class FakeImages:
+    latency = 0.0
+
+    def generate(self, model, prompt, size):
+        time.sleep(self.latency)
+        return {"b64_json": base64.b64encode(tiny_png()).decode()}
+
+class FakeHttpResponse:
+    status_code = 200
+    text = ""
+
+    def json(self):
+        return {"choices": [{"message": {"content": "Stub Groq reply."}}]}
+
+def provider_stubs(latency: float) -> ExitStack:
+    """Patch google.generativeai and requests.post process-wide; returns the active ExitStack."""
+    import google.generativeai as genai
+    import requests
+
+    FakeGenerativeModel.latency = latency
+    FakeImages.latency = latency
+    stack = ExitStack()
+    stack.enter_context(mock.patch.object(genai, "configure", lambda **kw: None))
+    stack.enter_context(mock.patch.object(genai, "list_models", lambda: [FakeModelInfo()]))
+    stack.enter_context(mock.patch.object(genai, "GenerativeModel", FakeGenerativeModel))
+    stack.enter_context(mock.patch.object(genai, "images", FakeImages(), create=True))
+    stack.enter_context(mock.patch.object(requests, "post", lambda *a, **kw: (time.sleep(latency), FakeHttpResponse())[1]))
+    return stack
+
+def read_app_credentials() -> tuple:
+    """(username, password) from the ADMIN_USERNAME / ADMIN_PASSWORD assignments in app.py."""
+    with open(APP_PATH, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=APP_PATH)
+    found = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant):
+            for target in node.targets:
+                if isinstance(target, ast.Name) and target.id in ("ADMIN_USERNAME", "ADMIN_PASSWORD"):
+                    found[target.id] = node.value.value
+    return found.get("ADMIN_USERNAME"), found.get("ADMIN_PASSWORD")
+
+# -------------------------
+# SESSION SCRIPT
+# -------------------------
+def _login(at, creds):
+    at.text_input(key="login_username").input(creds[0])
+    at.text_input(key="login_password").input(creds[1])
+    at.button(key="login_button").click()
+
+def _landing(at):
+    at.text_area(key="landing_html").input("<h1>Casagrand Flagship {PRICE}</h1><p>{LOCATION}</p><p>{DESC}</p>")
+    at.button(key="landing_generate").click()
+
+def _content(at):
+    at.button(key="content_generate").click()
+
+def _content_all_formats(at):
+    at.selectbox(key="content_type").select("All formats (campaign pack)")
+    at.button(key="content_generate").click()
+
+def _images(at):
+    at.button(key="img_generate").click()
+
+def _calendar(at):
+    pass  # static table; measures a plain rerun
+
+def _utilities(at):
+    at.button(key="wa_create").click()
+
+def _blog(at):
+    at.button(key="blog_generate").click()
+
+def _blog_cover(at):
+    at.button(key="gen_cover_auto").click()
+
+def _uploads(at):
+    # pick the first generated variant; no cloud credentials, so this measures rendering Uploads with a cover in session
+    at.button(key="use_cover_0").click()
+
+def _zoho(at):
+    at.text_area(key="zoho_req_area").input("When a lead is created with source 'Website', assign it to the sales queue.")
+    at.button(key="zoho_compile").click()
+
+STEPS = [
+    ("initial_load", None),
+    ("login", _login),
+    ("landing", _landing),
+    ("content", _content),
+    ("content_all", _content_all_formats),
+    ("images", _images),
+    ("calendar", _calendar),
+    ("utilities", _utilities),
+    ("blog", _blog),
+    ("blog_cover", _blog_cover),
+    ("uploads", _uploads),
+    ("zoho", _zoho),
+]
+
+def run_session(timeout: float, bg_image_kb: int, creds: tuple, on_step=None):
+    """Run one simulated session. Returns ({step: seconds}, AppTest)."""
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    if bg_image_kb:
+        fake_bg = "data:image/jpeg;base64," + "A" * (bg_image_kb * 1024)
+        at.session_state["bg_images"] = {p: fake_bg for p in PAGE_KEYS}
+    timings = {}
+    for name, action in STEPS:
+        if action is _login:
+            action(at, creds)
+        elif action:
+            action(at)
+        t0 = time.perf_counter()
+        at.run()
+        timings[name] = time.perf_counter() - t0
+        if at.exception:
+            raise RuntimeError(f"step '{name}' raised: {at.exception[0].message}")
+        if on_step:
+            on_step(name)
+    return timings, at
+
+# -------------------------
+# PASSES
+# -------------------------
+def profile_pass(args) -> dict:
+    # AppTest executes the script on its own thread, so profile every thread started during the session
+    profiles = []
+    orig_run = threading.Thread.run
+
+    def profiled_run(thread):
+        prof = cProfile.Profile()
+        profiles.append(prof)
+        prof.enable()
+        try:
+            orig_run(thread)
+        finally:
+            prof.disable()
+
+    main_prof = cProfile.Profile()
+    with mock.patch.object(threading.Thread, "run", profiled_run):
+        main_prof.enable()
+        timings, _ = run_session(args.timeout, args.bg_image_kb, args.creds)
+        main_prof.disable()
+    stats = pstats.Stats(main_prof, *profiles)
+    hot = {}
+    for (filename, _, func), (cc, nc, tt, ct, _) in stats.stats.items():
+        if func in HOT_SPOTS:
+            entry = hot.setdefault(func, {"calls": 0, "cumulative_ms": 0.0, "own_ms": 0.0})
+            entry["calls"] += nc
+            entry["cumulative_ms"] += ct * 1000
+            entry["own_ms"] += tt * 1000
+    app_funcs = [
+        {"function": func, "line": line, "calls": nc, "cumulative_ms": round(ct * 1000, 3)}
+        for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items()
+        if os.path.abspath(filename) == APP_PATH
+    ]
+    app_funcs.sort(key=lambda x: x["cumulative_ms"], reverse=True)
+    return {
+        "hot_spots": {k: {kk: round(vv, 3) for kk, vv in v.items()} for k, v in hot.items()},
+        "top_app_functions": app_funcs[:10],
+        "profiled_session_ms": round(sum(timings.values()) * 1000, 3),
+    }
+
+def memory_pass(args) -> dict:
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    per_step = {}
+
+    def on_step(name):
+        per_step[name] = round((tracemalloc.get_traced_memory()[0] - base) / 1024, 1)
+
+    _, at = run_session(args.timeout, args.bg_image_kb, args.creds, on_step=on_step)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del at
+    return {
+        "retained_kb_after_session": round((current - base) / 1024, 1),
+        "peak_kb_during_session": round((peak - base) / 1024, 1),
+        "retained_kb_by_step": per_step,
+    }
+
+def _current_rss_kb() -> int:
+    """Current (not peak) resident set size of this process."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss // 1024
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except Exception:
+        pass
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # peak only; last resort
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+_WORKER_STUBS = None
+
+def _worker_init(latency: float):
+    global _WORKER_STUBS
+    _WORKER_STUBS = provider_stubs(latency)
+    for name in APP_DEPS:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+
+def _session_worker(job: tuple) -> dict:
+    i, timeout, bg_image_kb, creds = job
+    rss_before = _current_rss_kb()
+    try:
+        timings, at = run_session(timeout, bg_image_kb, creds)
+    except Exception as e:
+        return {"session": i, "error": str(e)}
+    rss_after = _current_rss_kb()
+    del at
+    return {"session": i, "timings": timings, "rss_kb": rss_after - rss_before}
+
+def load_pass(args) -> dict:
+    samples = {name: [] for name, _ in STEPS}
+    failures = []
+    rss_per_session = []
+    jobs = [(i, args.timeout, args.bg_image_kb, args.creds) for i in range(args.sessions)]
+
+    # One fresh process per session: isolates AppTest's global runtime and makes RSS per session meaningful
+    ctx = multiprocessing.get_context("spawn")
+    t0 = time.perf_counter()
+    with ctx.Pool(processes=args.concurrency, initializer=_worker_init, initargs=(args.ai_latency,), maxtasksperchild=1) as pool:
+        for res in pool.imap_unordered(_session_worker, jobs):
+            if "error" in res:
+                failures.append(f"session {res['session']}: {res['error']}")
+                continue
+            rss_per_session.append(res["rss_kb"])
+            for k, v in res["timings"].items():
+                samples[k].append(v)
+    elapsed = time.perf_counter() - t0
+    completed = len(rss_per_session)
+    reruns = sum(len(v) for v in samples.values())
+    return {
+        "sessions_completed": completed,
+        "failures": failures,
+        "elapsed_s": round(elapsed, 3),
+        "reruns_per_s": round(reruns / elapsed, 2) if elapsed else None,
+        "rss_kb_per_session": {
+            "mean": round(statistics.fmean(rss_per_session), 1) if rss_per_session else None,
+            "max": max(rss_per_session) if rss_per_session else None,
+        },
+        "rerun_ms": {k: summarize(v) for k, v in samples.items()},
+    }
+
+# -------------------------
+# REPORTING
+# -------------------------
+def summarize(values: list) -> dict:
+    if not values:
+        return {"n": 0}
+    ms = sorted(v * 1000 for v in values)
+    q = statistics.quantiles(ms, n=20, method="inclusive") if len(ms) > 1 else [ms[0]] * 19
+    return {
+        "n": len(ms),
+        "mean": round(statistics.fmean(ms), 3),
+        "p50": round(statistics.median(ms), 3),
+        "p95": round(q[18], 3),
+        "max": round(ms[-1], 3),
+    }
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(APP_PATH), capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+def compare(report: dict, baseline: dict) -> str:
+    lines = [f"{'step':<14}{'p50 ms':>12}{'base':>12}{'delta':>10}{'p95 ms':>12}{'base':>12}{'delta':>10}"]
+    cur, old = report["load"]["rerun_ms"], baseline.get("load", {}).get("rerun_ms", {})
+    for step, s in cur.items():
+        b = old.get(step, {})
+        row = f"{step:<14}"
+        for metric in ("p50", "p95"):
+            v, bv = s.get(metric), b.get(metric)
+            delta = f"{(v - bv) / bv * 100:+.1f}%" if v is not None and bv else "n/a"
+            row += f"{v if v is not None else 'n/a':>12}{bv if bv is not None else 'n/a':>12}{delta:>10}"
+        lines.append(row)
+    cm, bm = report["memory"]["retained_kb_after_session"], baseline.get("memory", {}).get("retained_kb_after_session")
+    lines.append(f"session memory retained: {cm} KB (baseline {bm} KB)")
+    cr = report["load"]["rss_kb_per_session"].get("mean")
+    old_rss = baseline.get("load", {}).get("rss_kb_per_session")
+    br = old_rss.get("mean") if isinstance(old_rss, dict) else old_rss
+    lines.append(f"RSS per session (mean): {cr} KB (baseline {br} KB)")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the KonnectOps Streamlit app.")
+    parser.add_argument("--sessions", type=int, default=10, help="simulated sessions in the load pass")
+    parser.add_argument("--concurrency", type=int, default=4, help="sessions running at the same time")
+    parser.add_argument("--ai-latency", type=float, default=0.0, help="seconds each stubbed provider call sleeps")
+    parser.add_argument("--bg-image-kb", type=int, default=0, help="seed every tab background with a data URI of this size")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-rerun timeout in seconds")
+    parser.add_argument("--out", default="loadtest_report.json", help="where to write the JSON report")
+    parser.add_argument("--baseline", help="previous report to compare against")
+    parser.add_argument("--admin-user", default=os.environ.get("KONNECTOPS_ADMIN_USERNAME"), help="defaults to $KONNECTOPS_ADMIN_USERNAME, then ADMIN_USERNAME in app.py")
+    parser.add_argument("--admin-password", default=os.environ.get("KONNECTOPS_ADMIN_PASSWORD"), help="defaults to $KONNECTOPS_ADMIN_PASSWORD, then ADMIN_PASSWORD in app.py")
+    args = parser.parse_args(argv)
+    app_user, app_password = read_app_credentials()
+    args.creds = (args.admin_user or app_user, args.admin_password or app_password)
+    if not all(args.creds):
+        parser.error("admin credentials not found in app.py; pass --admin-user / --admin-password")
+
+    import streamlit
+
+    with provider_stubs(args.ai_latency):
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "git_revision": git_revision(),
+                "python": platform.python_version(),
+                "streamlit": streamlit.__version__,
+                "params": {k: v for k, v in vars(args).items() if k not in ("creds", "admin_password")},
+            },
+            "profile": profile_pass(args),
+            "memory": memory_pass(args),
+            "load": load_pass(args),
+        }
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.out}")
+    print(json.dumps(report["load"]["rerun_ms"], indent=2))
+    if args.baseline:
+        with open(args.baseline) as f:
+            print(compare(report, json.load(f)))
+    return 1 if report["load"]["failures"] else 0
+
+if __name__ == "__main__":
+    # AppTest replaces sys.modules["__main__"] with the app while it runs, so the spawn pool
+    # could not pickle _worker_init / _session_worker as __main__.*; run via the named module.
+    import loadtest
+    sys.exit(loadtest.main())
@@ -0,0 +1,38 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from content_formats import CONTENT_FORMATS, parse_multiformat_response
+
+
+def test_fenced_json_with_prose_braces():
+    reply = (
+        "Sure {here} is your pack:\n```json\n"
+        + json.dumps({f: f"{f} text" for f in CONTENT_FORMATS})
+        + "\n```\nLet me know {if} you need changes."
+    )
+    assert parse_multiformat_response(reply, CONTENT_FORMATS) == {f: f"{f} text" for f in CONTENT_FORMATS}
+
+
+def test_raw_newlines_inside_strings():
+    reply = '{"Blog Post": "# Title\nBody line", "LinkedIn Post": "Line 1\nLine 2"}'
+    parts = parse_multiformat_response(reply, CONTENT_FORMATS)
+    assert parts == {"Blog Post": "# Title\nBody line", "LinkedIn Post": "Line 1\nLine 2"}
+
+
+def test_truncated_object_keeps_complete_parts():
+    reply = '{"Blog Post": "Full blog", "Instagram Carousel": ["s1", "s2"], "LinkedIn Post": "cut off mid-sen'
+    parts = parse_multiformat_response(reply, CONTENT_FORMATS)
+    assert parts == {"Blog Post": "Full blog", "Instagram Carousel": "s1\n\ns2"}
+
+
+def test_list_valued_carousel_and_empty_parts_dropped():
+    reply = json.dumps({"Instagram Carousel": ["Slide 1 ", "", " Slide 2"], "Client Email": "   ", "Blog Post": 42})
+    assert parse_multiformat_response(reply, CONTENT_FORMATS) == {"Instagram Carousel": "Slide 1\n\nSlide 2"}
+
+
+def test_no_json():
+    assert parse_multiformat_response("no json here", CONTENT_FORMATS) == {}
+    assert parse_multiformat_response("", CONTENT_FORMATS) == {}